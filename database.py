@@ -3,13 +3,16 @@ Database Helper Functions
 
 MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
+All helpers are coroutines backed by Motor, so await them from `async def` handlers.
 """
 
-from pymongo import MongoClient
-from datetime import datetime, timezone
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel
+from pymongo.errors import BulkWriteError
+from datetime import date, datetime, time, timezone
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import Any, Dict, List, Sequence, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -21,35 +24,142 @@ db = None
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
+# Keep a few connections warm and cap idle/queue time so bursts don't pile up sockets
+POOL_OPTIONS = {
+    "minPoolSize": 10,
+    "maxPoolSize": 50,
+    "maxIdleTimeMS": 30000,
+    "waitQueueTimeoutMS": 2500,
+    "serverSelectionTimeoutMS": 3000,
+    "retryWrites": True,
+}
+
+# One client per process, shared by every request
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    _client = AsyncIOMotorClient(database_url, **POOL_OPTIONS)
     db = _client[database_name]
 
+
+def pool_settings() -> Dict[str, Any]:
+    """Configured pool options and topology type (not live usage; safe to expose: no server addresses)"""
+    if _client is None:
+        return {}
+
+    pool = _client.options.pool_options
+    return {
+        "min_pool_size": pool.min_pool_size,
+        "max_pool_size": pool.max_pool_size,
+        "max_idle_time_seconds": pool.max_idle_time_seconds,
+        "wait_queue_timeout_seconds": pool.wait_queue_timeout,
+        "topology_type": _client.topology_description.topology_type_name,
+    }
+
+
+def topology_summary() -> str:
+    """Full topology description, including server addresses; for logs only"""
+    return str(_client.topology_description) if _client is not None else ""
+
+# Indexes on the fields we filter/sort on, as (field, direction[, options]).
+# Unique ones also act as conflict detection for inserts (no lookup before insert).
+INDEXES = {
+    "task": [("project_id", 1)],
+    "ceeapplication": [("project_id", 1), ("status", 1)],
+    "marapplication": [("project_id", 1)],
+    "audit": [("project_id", 1)],
+    "document": [("project_id", 1)],
+    "user": [("email", 1, {"unique": True})],
+}
+
+
+async def ensure_indexes():
+    """Create the declared indexes (idempotent, safe on every startup)"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    for collection_name, specs in INDEXES.items():
+        await db[collection_name].create_indexes(
+            [IndexModel([(spec[0], spec[1])], **(spec[2] if len(spec) > 2 else {})) for spec in specs]
+        )
+
+def to_bson(value: Any) -> Any:
+    """Make plain Python values BSON-encodable: BSON has no date-only type, so
+    `date` becomes midnight UTC (still range-queryable and sortable, and
+    rendered back as a plain date by `get_documents`); `datetime` values stay
+    native BSON Dates."""
+    if isinstance(value, dict):
+        return {k: to_bson(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_bson(v) for v in value]
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, time.min, tzinfo=timezone.utc)
+    return value
+
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
 
     # Convert Pydantic model to dict if needed
     if isinstance(data, BaseModel):
-        data_dict = data.model_dump()
+        data_dict = to_bson(data.model_dump())
     else:
         data_dict = data.copy()
 
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    # Single round-trip: conflicts surface as DuplicateKeyError from the unique indexes
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def create_documents(collection_name: str, data: List[dict]):
+    """Insert many plain-dict documents with timestamps in one unordered batch"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    now = datetime.now(timezone.utc)
+    documents = [to_bson(data_dict) for data_dict in data]
+    for data_dict in documents:
+        data_dict['created_at'] = now
+        data_dict['updated_at'] = now
+
+    try:
+        result = await db[collection_name].insert_many(documents, ordered=False)
+    except BulkWriteError as exc:
+        # Unordered: everything but the failed indexes went in; expose their ids to the caller
+        failed = {error["index"] for error in exc.details.get("writeErrors", [])}
+        exc.inserted_ids = [str(d["_id"]) for i, d in enumerate(documents) if i not in failed and "_id" in d]
+        raise
+    return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, date_fields: Sequence[str] = ()):
+    """Get documents from collection, with `_id` returned as a string `id`.
+
+    `date_fields` are date-only fields stored as midnight-UTC BSON Dates (see
+    `to_bson`); they are rendered back as "YYYY-MM-DD" strings.
+    """
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-    
-    cursor = db[collection_name].find(filter_dict or {})
+
+    # Let mongod do the ObjectId -> str conversion instead of a Python loop;
+    # sorting on _id keeps pages stable for keyset pagination
+    pipeline = [{"$match": filter_dict or {}}, {"$sort": {"_id": 1}}]
     if limit:
-        cursor = cursor.limit(limit)
-    
-    return list(cursor)
+        pipeline.append({"$limit": limit})
+    added = {"id": {"$toString": "$_id"}}
+    for field in date_fields:
+        # Only real Dates are converted; missing/null or legacy string values pass through
+        added[field] = {
+            "$cond": [
+                {"$eq": [{"$type": f"${field}"}, "date"]},
+                {"$dateToString": {"format": "%Y-%m-%d", "date": f"${field}"}},
+                f"${field}",
+            ]
+        }
+    pipeline += [
+        {"$addFields": added},
+        {"$project": {"_id": 0}},
+    ]
+
+    return await db[collection_name].aggregate(pipeline).to_list(length=limit or None)
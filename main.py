@@ -1,10 +1,29 @@
+import asyncio
+import logging
 import os
-from fastapi import FastAPI, HTTPException
+import re
+import time
+import msgspec
+import orjson
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from functools import lru_cache
+from types import MappingProxyType
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Any, Dict, List, Optional
-
-from database import db, create_document, get_documents
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from starlette.responses import Response
+from typing import Annotated, Any, Dict, List, Optional, Tuple, Type, get_args
+
+from serialization import ORJSONResponse
+from structs import MS_TYPES
+from response_cache import cached_list, init_cache, invalidate, stale_response
+from database import db, create_document, create_documents, ensure_indexes, get_documents, pool_settings, topology_summary
 from schemas import (
     User,
     Client,
@@ -16,29 +35,110 @@ from schemas import (
     Audit,
 )
 
-app = FastAPI(title="ERFMS Backend", version="0.1.0")
+# Child of uvicorn's error logger so startup info is emitted under uvicorn's logging config
+logger = logging.getLogger("uvicorn.error").getChild("erfms")
+
+# /test serves the collection list from memory; a background task keeps it warm
+# and the probe reports the list as stale once it is older than COLLECTIONS_TTL
+COLLECTIONS_TTL = 60
+COLLECTIONS_REFRESH_INTERVAL = 30
+
+
+async def _refresh_collections(app: FastAPI) -> List[str]:
+    collections = await db.list_collection_names()
+    app.state.collections_cache = (time.time(), collections)
+    return collections
+
+
+async def _keep_collections_fresh(app: FastAPI):
+    while True:
+        try:
+            await _refresh_collections(app)
+        except Exception:
+            logger.warning("Could not refresh collection list", exc_info=True)
+        await asyncio.sleep(COLLECTIONS_REFRESH_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_cache()
+    if db is not None:
+        logger.info("MongoDB pool: %s; topology: %s", pool_settings(), topology_summary())
+        try:
+            await ensure_indexes()
+        except PyMongoError:
+            logger.warning("Could not create MongoDB indexes", exc_info=True)
+    # The schema only changes on deploy, so build and encode it once
+    app.state.schema_payload = _build_schema()
+    app.state.schema_bytes = orjson.dumps(app.state.schema_payload)
+    app.state.collections_cache = (0.0, [])
+    refresher = asyncio.create_task(_keep_collections_fresh(app)) if db is not None else None
+    yield
+    if refresher is not None:
+        refresher.cancel()
+
+
+app = FastAPI(
+    title="ERFMS Backend",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# Comma-separated list of frontend origins; without it any origin may read (but not with credentials)
+ALLOWED_ORIGINS = [o.strip() for o in os.getenv("ALLOWED_ORIGINS", "").split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=ALLOWED_ORIGINS or ["*"],
+    allow_credentials=bool(ALLOWED_ORIGINS),
+    allow_methods=["GET", "POST"],
+    # Conditional GETs: let dashboards read ETag and send If-None-Match / Cache-Control
+    allow_headers=["Authorization", "Content-Type", "If-None-Match", "Cache-Control"],
+    expose_headers=["ETag"],
+    max_age=86400,
 )
 
 
+class DatabaseUnavailable(Exception):
+    """Raised by list reads when MongoDB can't serve them"""
+
+    def __init__(self, collection: str, limit: Optional[int], cursor: Optional[str] = None):
+        self.collection = collection
+        self.limit = limit
+        self.cursor = cursor
+
+
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailable):
+    """Serve the last good first page of the list if we have one, else 503"""
+    stale = None if exc.cursor else await stale_response(exc.collection, exc.limit)
+    if stale is not None:
+        return stale
+    return ORJSONResponse(status_code=503, content={"detail": "Database not available"})
+
+
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "ERFMS Backend running", "version": app.version}
 
 
 @app.get("/api/hello")
-def hello():
+async def hello():
     return {"message": "Hello from the ERFMS backend API!"}
 
 
+# Fixed for the life of the process, so /test doesn't re-read them on every probe
+HAS_DB_URL = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
+HAS_DB_NAME = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
+DB_NAME = getattr(db, "name", "✅ Connected")
+
+
 @app.get("/test")
-def test_database():
+async def test_database():
     """Test endpoint to check if database is available and accessible"""
     response: Dict[str, Any] = {
         "backend": "✅ Running",
@@ -47,18 +147,29 @@ def test_database():
         "database_name": None,
         "connection_status": "Not Connected",
         "collections": [],
+        "collections_age_seconds": None,
+        "pool": {},
     }
 
     try:
         if db is not None:
             response["database"] = "✅ Available"
             response["database_url"] = "✅ Configured"
-            response["database_name"] = getattr(db, "name", "✅ Connected")
+            response["database_name"] = DB_NAME
             response["connection_status"] = "Connected"
+            response["pool"] = pool_settings()
             try:
-                collections = db.list_collection_names()
+                # Never touch Mongo here; the background task keeps this warm
+                cached_at, collections = app.state.collections_cache
+                age = time.time() - cached_at if cached_at else None
                 response["collections"] = collections[:10]
-                response["database"] = "✅ Connected & Working"
+                response["collections_age_seconds"] = round(age, 1) if age is not None else None
+                if age is None:
+                    response["database"] = "⚠️  Connected, collections not loaded yet"
+                elif age >= COLLECTIONS_TTL:
+                    response["database"] = "⚠️  Connected but collection list is stale"
+                else:
+                    response["database"] = "✅ Connected & Working"
             except Exception as e:  # pragma: no cover - safety
                 response["database"] = f"⚠️  Connected but Error: {str(e)[:50]}"
         else:
@@ -66,8 +177,8 @@ def test_database():
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:50]}"
 
-    response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
+    response["database_url"] = HAS_DB_URL
+    response["database_name"] = HAS_DB_NAME
 
     return response
 
@@ -80,28 +191,39 @@ class SchemaField(BaseModel):
     description: Optional[str] = None
 
 
+@lru_cache(maxsize=None)
+def _fields_for(model: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """Field descriptions for a model; model_fields never changes at runtime."""
+    return [
+        SchemaField(
+            name=name,
+            type=str(field.annotation.__name__) if hasattr(field.annotation, "__name__") else str(field.annotation),
+            required=field.is_required(),
+            description=(field.description or None),
+        ).model_dump()
+        for name, field in model.model_fields.items()
+    ]
+
+
+def _build_schema() -> Dict[str, Any]:
+    """Describe available collections (derived from Pydantic models)."""
+    models = (User, Client, Document, Project, Task, CEEApplication, MARApplication, Audit)
+    return {
+        "collections": [
+            {
+                "name": model.__name__.lower(),
+                "title": model.__name__,
+                "fields": _fields_for(model),
+            }
+            for model in models
+        ]
+    }
+
+
 @app.get("/schema")
-def get_schema():
-    """Expose available collections (derived from Pydantic models)."""
-    models = [User, Client, Document, Project, Task, CEEApplication, MARApplication, Audit]
-    payload: Dict[str, Any] = {"collections": []}
-    for model in models:
-        fields: List[SchemaField] = []
-        for name, field in model.model_fields.items():
-            fields.append(
-                SchemaField(
-                    name=name,
-                    type=str(field.annotation.__name__) if hasattr(field.annotation, "__name__") else str(field.annotation),
-                    required=field.is_required(),
-                    description=(field.description or None),
-                ).model_dump()
-            )
-        payload["collections"].append({
-            "name": model.__name__.lower(),
-            "title": model.__name__,
-            "fields": fields,
-        })
-    return payload
+async def get_schema():
+    """Expose available collections (precomputed at startup)."""
+    return Response(app.state.schema_bytes, media_type="application/json")
 
 
 # --- Helper ---
@@ -117,76 +239,217 @@ COLLECTIONS = {
 }
 
 
-def list_items(collection: str, limit: Optional[int] = 100):
+def _date_fields(model: Type[BaseModel]) -> Tuple[str, ...]:
+    """Names of date-only (not datetime) fields, including Optional[date]"""
+    return tuple(
+        name for name, field in model.model_fields.items()
+        if date in (field.annotation, *get_args(field.annotation))
+    )
+
+
+# Date-only fields per collection, rendered back as "YYYY-MM-DD" on read
+DATE_FIELDS = {collection: _date_fields(model) for collection, model in COLLECTIONS.items()}
+
+
+async def list_items(collection: str, limit: int = 100, cursor: Optional[str] = None):
+    """One page of a collection in _id order; pass the returned next_cursor to get the next page"""
     if db is None:
-        raise HTTPException(status_code=503, detail="Database not available")
-    data = get_documents(collection, {}, limit)
-    # Convert ObjectId to string safely
-    for d in data:
-        if "_id" in d:
-            d["id"] = str(d.pop("_id"))
-    return data
+        raise DatabaseUnavailable(collection, limit, cursor)
+    filter_dict: Dict[str, Any] = {}
+    if cursor:
+        try:
+            filter_dict["_id"] = {"$gt": ObjectId(cursor)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        data = await get_documents(collection, filter_dict, limit, DATE_FIELDS[collection])
+    except PyMongoError:
+        raise DatabaseUnavailable(collection, limit, cursor)
+    # Raw documents go straight to orjson, bypassing jsonable_encoder
+    return ORJSONResponse({
+        "items": data,
+        "next_cursor": data[-1]["id"] if len(data) == limit else None,
+    })
 
 
-def create_item(collection: str, model: BaseModel):
+async def create_item(collection: str, model: BaseModel):
     if db is None:
         raise HTTPException(status_code=503, detail="Database not available")
-    inserted_id = create_document(collection, model)
+    try:
+        inserted_id = await create_document(collection, model)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail=f"{collection} already exists")
     return {"id": inserted_id}
 
 
 # --- Minimal CRUD endpoints for key resources ---
-@app.get("/api/projects")
-def api_list_projects(limit: int = 100):
-    return list_items("project", limit)
-
-
-@app.post("/api/projects")
-def api_create_project(payload: Project):
-    return create_item("project", payload)
-
-
-@app.get("/api/cee")
-def api_list_cee(limit: int = 100):
-    return list_items("ceeapplication", limit)
-
-
-@app.post("/api/cee")
-def api_create_cee(payload: CEEApplication):
-    return create_item("ceeapplication", payload)
-
-
-@app.get("/api/mar")
-def api_list_mar(limit: int = 100):
-    return list_items("marapplication", limit)
-
-
-@app.post("/api/mar")
-def api_create_mar(payload: MARApplication):
-    return create_item("marapplication", payload)
-
-
-@app.get("/api/audits")
-def api_list_audits(limit: int = 100):
-    return list_items("audit", limit)
-
-
-@app.post("/api/audits")
-def api_create_audit(payload: Audit):
-    return create_item("audit", payload)
-
-
-@app.get("/api/documents")
-def api_list_documents(limit: int = 100):
-    return list_items("document", limit)
+# URL segment -> collection; each gets a cached GET list and an invalidating POST create
+API_ROUTES = MappingProxyType({
+    "projects": "project",
+    "cee": "ceeapplication",
+    "mar": "marapplication",
+    "audits": "audit",
+    "documents": "document",
+})
+
+# Singular resource name per URL segment, keeping the published create operationIds
+# (api_create_project, api_create_audit, ...) stable for generated clients
+API_CREATE_NAMES = MappingProxyType({
+    "projects": "project",
+    "cee": "cee",
+    "mar": "mar",
+    "audits": "audit",
+    "documents": "document",
+})
+
+# Validators are compiled once at import and reused for every POST body
+ADAPTERS = {collection: TypeAdapter(model) for collection, model in COLLECTIONS.items()}
+
+router = APIRouter()
+
+
+def _make_endpoints(segment: str, collection: str):
+    @cached_list(collection)
+    async def list_endpoint(limit: int = Query(100, ge=1, le=500), cursor: Optional[str] = None):
+        return await list_items(collection, limit, cursor)
+
+    adapter = ADAPTERS[collection]
+
+    async def create_endpoint(request: Request):
+        try:
+            payload = adapter.validate_json(await request.body())
+        except ValidationError as exc:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in exc.errors(include_url=False)]
+            )
+        result = await create_item(collection, payload)
+        await invalidate(collection)
+        return result
+
+    list_endpoint.__name__ = f"api_list_{segment}"
+    create_endpoint.__name__ = f"api_create_{API_CREATE_NAMES[segment]}"
+    return list_endpoint, create_endpoint
+
+
+for _segment, _collection in API_ROUTES.items():
+    _list, _create = _make_endpoints(_segment, _collection)
+    router.get(f"/api/{_segment}")(_list)
+    # The body is validated by hand, so describe it for OpenAPI explicitly
+    router.post(
+        f"/api/{_segment}",
+        openapi_extra={
+            "requestBody": {
+                "required": True,
+                "content": {"application/json": {"schema": COLLECTIONS[_collection].model_json_schema()}},
+            }
+        },
+    )(_create)
+
+
+# --- Bulk import fast path (msgspec decoding, single insert_many) ---
+# Same resources as the single-record endpoints; batches are bounded like list reads
+BULK_MAX_ITEMS = 500
+BULK_MAX_BYTES = 5 * 1024 * 1024
+BULK_DECODERS = {
+    collection: msgspec.json.Decoder(Annotated[List[MS_TYPES[collection]], msgspec.Meta(max_length=BULK_MAX_ITEMS)])
+    for collection in API_ROUTES.values()
+}
 
 
-@app.post("/api/documents")
-def api_create_document(payload: Document):
-    return create_item("document", payload)
+def _msgspec_errors(exc: msgspec.DecodeError) -> List[Dict[str, Any]]:
+    """Translate a msgspec error into FastAPI's 422 `detail` entry shape"""
+    msg, _, path = str(exc).partition(" - at `")
+    loc: List[Any] = ["body"]
+    for index, key in re.findall(r"\[(\d+)\]|\.(\w+)", path.rstrip("`")):
+        loc.append(int(index) if index else key)
+    error_type = "value_error" if isinstance(exc, msgspec.ValidationError) else "json_invalid"
+    return [{"type": error_type, "loc": tuple(loc), "msg": msg}]
+
+
+def _make_bulk_endpoint(collection: str):
+    decoder = BULK_DECODERS[collection]
+
+    async def bulk_endpoint(request: Request):
+        body = bytearray()
+        async for chunk in request.stream():
+            body += chunk
+            if len(body) > BULK_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Bulk body exceeds {BULK_MAX_BYTES} bytes")
+        try:
+            items = decoder.decode(body)
+        except msgspec.DecodeError as exc:
+            raise RequestValidationError(_msgspec_errors(exc))
+        if not items:
+            return {"ids": []}
+        if db is None:
+            raise HTTPException(status_code=503, detail="Database not available")
+
+        try:
+            ids = await create_documents(
+                collection, [msgspec.to_builtins(item, builtin_types=(date, datetime)) for item in items]
+            )
+        except BulkWriteError as exc:
+            errors = exc.details.get("writeErrors", [])
+            conflict = bool(errors) and all(error.get("code") == 11000 for error in errors)
+            return ORJSONResponse(
+                status_code=409 if conflict else 500,
+                content={
+                    "detail": f"{len(exc.inserted_ids)} of {len(items)} {collection} inserted; "
+                    + ("the rest conflicted" if conflict else "the rest failed to write"),
+                    "ids": exc.inserted_ids,
+                },
+            )
+        finally:
+            await invalidate(collection)
+        return {"ids": ids}
+
+    bulk_endpoint.__name__ = f"api_bulk_create_{collection}"
+    return bulk_endpoint
+
+
+for _collection in BULK_DECODERS:
+    # Decoded by msgspec, so document the body with the Pydantic model explicitly
+    router.post(
+        f"/api/bulk/{_collection}",
+        openapi_extra={
+            "requestBody": {
+                "required": True,
+                "content": {
+                    "application/json": {
+                        "schema": {
+                            "type": "array",
+                            "maxItems": BULK_MAX_ITEMS,
+                            "items": COLLECTIONS[_collection].model_json_schema(),
+                        }
+                    }
+                },
+            }
+        },
+    )(_make_bulk_endpoint(_collection))
+
+
+app.include_router(router)
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Workers only share cache invalidation through Redis; without it the
+    # in-memory cache is per process, so stay single-worker. Each worker also
+    # keeps minPoolSize (10) Mongo connections open, so the default is one
+    # worker per core rather than 2n+1.
+    has_redis = bool(os.getenv("REDIS_URL"))
+    workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) if has_redis else 1))
+    if workers > 1 and not has_redis:
+        raise SystemExit("WEB_CONCURRENCY > 1 requires REDIS_URL so workers share the response cache")
+    # Import string form is required for workers > 1
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        backlog=2048,
+        limit_concurrency=1000,
+    )
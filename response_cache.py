@@ -0,0 +1,257 @@
+"""
+Response Cache Helpers
+
+Redis-backed response caching for the list endpoints (via fastapi-cache2).
+Call `init_cache()` once at startup, decorate read handlers with
+`@cached_list(collection)` and call `invalidate(collection)` after a write
+to that collection. Cached lists carry a weak ETag so pollers can revalidate
+with If-None-Match and get a bodiless 304.
+
+The last good first page (no cursor) of every list is also kept (for
+STALE_TTL) so it can be served as a stale fallback while MongoDB is unreachable.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Optional, Union
+
+import xxhash
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.backends.redis import RedisBackend
+from redis import asyncio as aioredis
+from starlette.requests import Request
+from starlette.responses import Response
+
+from serialization import ORJSONResponse
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "erfms"
+
+# Freshness bounds (seconds) per tier
+CACHE_TIERS = {
+    "short": (1, 10),
+    "normal": (10, 30),
+    "long": (30, 60),
+}
+
+# Floor TTL (seconds) per collection, tuned to how often it is written. Slow
+# responses earn up to the cap of the tier the floor sits in.
+CACHE_POLICY = {
+    "project": 5,
+    "ceeapplication": 15,
+    "marapplication": 15,
+    "audit": 45,
+    "document": 45,
+}
+
+# How long a last-good copy stays usable as a fallback (seconds)
+STALE_TTL = 24 * 60 * 60
+
+redis = None
+
+# Stale fallback copies when running without Redis (per-process, LRU-bounded)
+STALE_MAX_ENTRIES = 64
+_stale_store: "OrderedDict[str, dict]" = OrderedDict()
+
+redis_url = os.getenv("REDIS_URL")
+
+if redis_url:
+    redis = aioredis.from_url(redis_url)
+
+
+def init_cache():
+    """Initialise FastAPICache (Redis when REDIS_URL is set, in-process memory otherwise)"""
+    backend = RedisBackend(redis) if redis is not None else InMemoryBackend()
+    FastAPICache.init(backend, prefix=CACHE_PREFIX)
+
+
+def cache_tier(baseline: int) -> str:
+    """Name of the tier whose [lower, upper) range contains the baseline TTL"""
+    for name, (lower, upper) in CACHE_TIERS.items():
+        if lower <= baseline < upper:
+            return name
+    return "long"
+
+
+def freshness(collection: str, generation_time: float) -> int:
+    """TTL for a freshly generated response: clamp(baseline, generation_time * 3 + baseline, tier_max)"""
+    baseline = CACHE_POLICY[collection]
+    _, upper = CACHE_TIERS[cache_tier(baseline)]
+    return min(int(generation_time * 3 + baseline), upper)
+
+
+def list_key_builder(
+    func: Callable,
+    namespace: str = "",
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: Optional[tuple] = None,
+    kwargs: Optional[dict] = None,
+) -> str:
+    """Key list responses on (collection, limit, cursor) only; the lists are global, not per-user"""
+    kwargs = kwargs or {}
+    digest = hashlib.md5(f"{namespace}:{kwargs.get('limit')}:{kwargs.get('cursor')}".encode()).hexdigest()  # nosec: B303 - not security sensitive
+    return f"{FastAPICache.get_prefix()}:{namespace}:{digest}"
+
+
+def make_etag(encoded: Union[str, bytes]) -> str:
+    """Weak ETag for an encoded cache entry"""
+    if isinstance(encoded, str):
+        encoded = encoded.encode()
+    return f'W/"{xxhash.xxh3_64_hexdigest(encoded)}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header (`*` or a comma-separated list) against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def cached_list(collection: str):
+    """Cache a list handler's encoded body under the collection's policy, sizing the TTL from how long the handler took"""
+
+    def wrapper(func):
+        signature = inspect.signature(func)
+        parameters = list(signature.parameters.values()) + [
+            inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+        ]
+
+        @wraps(func)
+        async def inner(*args, request: Request, **kwargs):
+            if request.headers.get("Cache-Control") in ("no-store", "no-cache"):
+                return await func(*args, **kwargs)
+
+            backend = FastAPICache.get_backend()
+            key = list_key_builder(func, collection, kwargs=kwargs)
+            etag_key = f"{key}:etag"
+
+            # Revalidation only needs the small ETag entry, not the body
+            etag = None
+            if_none_match = request.headers.get("If-None-Match")
+            if if_none_match:
+                try:
+                    ttl, etag = await backend.get_with_ttl(etag_key)
+                except Exception:
+                    logger.warning("Error retrieving cache key '%s'", etag_key, exc_info=True)
+                    ttl, etag = 0, None
+                if isinstance(etag, bytes):
+                    etag = etag.decode()
+                if etag is not None and etag_matches(if_none_match, etag):
+                    return Response(
+                        status_code=304,
+                        headers={"ETag": etag, "Cache-Control": f"max-age={ttl}"},
+                    )
+
+            # Hits are served as the stored bytes, with no decode/re-encode
+            try:
+                ttl, cached = await backend.get_with_ttl(key)
+                if cached is not None and etag is None:
+                    etag = await backend.get(etag_key)
+            except Exception:
+                logger.warning("Error retrieving cache key '%s'", key, exc_info=True)
+                ttl, cached = 0, None
+            if cached is not None:
+                if isinstance(etag, bytes):
+                    etag = etag.decode()
+                return Response(
+                    content=cached,
+                    media_type="application/json",
+                    headers={"ETag": etag or make_etag(cached), "Cache-Control": f"max-age={ttl}"},
+                )
+
+            started = time.perf_counter()
+            result = await func(*args, **kwargs)
+            ttl = freshness(collection, time.perf_counter() - started)
+            if not isinstance(result, Response):
+                result = ORJSONResponse(jsonable_encoder(result))
+
+            etag = make_etag(result.body)
+            try:
+                await backend.set(key, result.body, ttl)
+                await backend.set(etag_key, etag, ttl)
+            except Exception:
+                logger.warning("Error setting cache key '%s'", key, exc_info=True)
+            # Only first pages get a fallback copy; cursors are client-chosen and unbounded
+            if not kwargs.get("cursor"):
+                await remember_response(
+                    stale_key(collection, kwargs.get("limit")),
+                    result.body,
+                    {"Content-Type": result.media_type, "ETag": etag},
+                    result.status_code,
+                )
+            result.headers["Cache-Control"] = f"max-age={ttl}"
+            result.headers["ETag"] = etag
+            return result
+
+        inner.__signature__ = signature.replace(parameters=parameters)
+        return inner
+
+    return wrapper
+
+
+async def invalidate(collection: str):
+    """Drop every cached list response for a collection"""
+    try:
+        await FastAPICache.clear(namespace=collection)
+    except Exception:
+        logger.warning("Error clearing cache namespace '%s'", collection, exc_info=True)
+
+
+def stale_key(collection: str, limit: Optional[int]) -> str:
+    """Key of the last-known-good first page; kept outside the namespace so invalidate() leaves it alone"""
+    return f"{CACHE_PREFIX}:stale:{collection}:{limit}"
+
+
+async def remember_response(key: str, body: bytes, headers: Dict[str, str], status: int):
+    """Store the last good response for a list endpoint, usable for STALE_TTL seconds"""
+    record = {"body": body, "headers": json.dumps(headers), "status": status}
+    try:
+        if redis is not None:
+            async with redis.pipeline(transaction=True) as pipe:
+                await pipe.hset(key, mapping=record).expire(key, STALE_TTL).execute()
+        else:
+            _stale_store[key] = {**record, "expires_at": time.time() + STALE_TTL}
+            _stale_store.move_to_end(key)
+            while len(_stale_store) > STALE_MAX_ENTRIES:
+                _stale_store.popitem(last=False)
+    except Exception:
+        logger.warning("Error storing stale copy '%s'", key, exc_info=True)
+
+
+async def stale_response(collection: str, limit: Optional[int]) -> Optional[Response]:
+    """Rebuild the last good first page for a list endpoint, or None if there isn't one"""
+    key = stale_key(collection, limit)
+    try:
+        if redis is not None:
+            record = {k.decode(): v for k, v in (await redis.hgetall(key)).items()}
+        else:
+            record = _stale_store.get(key, {})
+            if record and record["expires_at"] < time.time():
+                del _stale_store[key]
+                record = {}
+    except Exception:
+        logger.warning("Error retrieving stale copy '%s'", key, exc_info=True)
+        return None
+    if not record:
+        return None
+
+    headers = json.loads(record["headers"])
+    headers["Cache-Control"] = "no-store"
+    headers["Warning"] = '110 - "Response is Stale"'
+    headers["X-Cache"] = "stale-fallback"
+    return Response(content=record["body"], status_code=int(record["status"]), headers=headers)
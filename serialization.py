@@ -0,0 +1,34 @@
+"""
+JSON Serialization
+
+orjson-backed response class used as the app-wide default. Handlers that
+return raw Mongo documents can wrap them in `ORJSONResponse` directly and
+skip FastAPI's jsonable_encoder pass; BSON types are handled by `bson_default`.
+"""
+
+import base64
+from typing import Any
+
+import orjson
+from bson import Decimal128
+from fastapi.responses import ORJSONResponse as _ORJSONResponse
+
+
+def bson_default(obj: Any) -> Any:
+    """Encode the BSON types orjson doesn't know about; anything else falls back to str()"""
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, bytes):  # bson.Binary is a bytes subclass
+        return base64.b64encode(obj).decode()
+    return str(obj)  # ObjectId, Regex, Timestamp, ...
+
+
+class ORJSONResponse(_ORJSONResponse):
+    """ORJSONResponse that also encodes BSON types (e.g. ObjectId)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=bson_default,
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY,
+        )
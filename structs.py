@@ -0,0 +1,91 @@
+"""
+msgspec mirrors of the Pydantic schemas
+
+Used only by the bulk-import fast path, where msgspec decodes the request
+body straight into typed structs. Keep these in sync with schemas.py, which
+stays the source of truth for the regular endpoints and OpenAPI.
+"""
+
+import msgspec
+from typing import Annotated, Optional, Literal
+from datetime import date, datetime
+
+NonNegative = Annotated[float, msgspec.Meta(ge=0)]
+PositiveInt = Annotated[int, msgspec.Meta(ge=1)]
+
+
+class DocumentMS(msgspec.Struct, kw_only=True):
+    project_id: Optional[str] = None
+    title: str
+    doc_type: Literal[
+        "quote",
+        "invoice",
+        "contract",
+        "photo",
+        "audit_report",
+        "cee_attachment",
+        "mar_attachment",
+        "other"
+    ] = "other"
+    url: Optional[str] = None
+    version: Optional[PositiveInt] = 1
+    notes: Optional[str] = None
+
+
+class ProjectMS(msgspec.Struct):
+    title: str
+    client_id: Optional[str] = None
+    manager_id: Optional[str] = None
+    status: Literal[
+        "draft",
+        "in_progress",
+        "awaiting_documents",
+        "awaiting_approval",
+        "completed",
+        "archived"
+    ] = "draft"
+    start_date: Optional[date] = None
+    due_date: Optional[date] = None
+    budget_eur: Optional[NonNegative] = None
+    description: Optional[str] = None
+
+
+class CEEApplicationMS(msgspec.Struct):
+    project_id: str
+    status: Literal["draft", "submitted", "awaiting_approval", "approved", "rejected"] = "draft"
+    submission_date: Optional[date] = None
+    approval_date: Optional[date] = None
+    cee_volume_kwh: Optional[NonNegative] = None
+    cee_value_eur: Optional[NonNegative] = None
+
+
+class MARApplicationMS(msgspec.Struct):
+    project_id: str
+    status: Literal[
+        "pre_application",
+        "submitted",
+        "awaiting_instruction",
+        "instruction_in_progress",
+        "grant_awarded",
+        "payment_received"
+    ] = "pre_application"
+    amount_eur: Optional[NonNegative] = None
+    last_update: Optional[datetime] = None
+
+
+class AuditMS(msgspec.Struct):
+    project_id: str
+    status: Literal["scheduled", "in_progress", "report_generated", "client_reviewed"] = "scheduled"
+    scheduled_date: Optional[date] = None
+    auditor_id: Optional[str] = None
+    report_document_id: Optional[str] = None
+
+
+# Collection name -> struct for the collections exposed by main.API_ROUTES
+MS_TYPES = {
+    "document": DocumentMS,
+    "project": ProjectMS,
+    "ceeapplication": CEEApplicationMS,
+    "marapplication": MARApplicationMS,
+    "audit": AuditMS,
+}